@@ -1,7 +1,6 @@
 import json
 import os
 import sys
-import subprocess
 from datetime import datetime, timezone, timedelta
 from helper import *
 from Sync import sync_local_tasks_to_notion_and_todoist
@@ -10,7 +9,7 @@ from Sync import sync_local_tasks_to_notion_and_todoist
 GMT_PLUS_8 = timezone(timedelta(hours=8))
 
 # Function to create a task in Todoist
-def create_todoist_task(task_name, existing_tasks, completed_tasks):
+def create_todoist_task(task_name, task_description, existing_tasks, completed_tasks):
     for task in existing_tasks:
         if task['content'] == task_name:
             print(f"Task '{task_name}' already exists in Todoist, skipping...")
@@ -23,7 +22,8 @@ def create_todoist_task(task_name, existing_tasks, completed_tasks):
 
     url = 'https://api.todoist.com/rest/v2/tasks'
     payload = {
-        'content': task_name
+        'content': task_name,
+        'description': task_description
     }
     response = requests.post(url, headers=todoist_headers, data=json.dumps(payload))
     response.raise_for_status()
@@ -82,6 +82,8 @@ def sync_notion_to_json():
         task_due_date = task['properties']['Date']['date']['start'] if task['properties']['Date']['date'] else None
         task_labels = [label['name'] for label in task['properties']['Type']['multi_select']]
 
+        task_edited_time = task.get('last_edited_time')
+
         if task_due_date:
             # Remove milliseconds from the due date and localize to GMT+8
             task_due_date = datetime.fromisoformat(task_due_date).replace(microsecond=0).astimezone(GMT_PLUS_8).isoformat()
@@ -107,13 +109,39 @@ def sync_notion_to_json():
                 task_data['labels'] = task_labels
                 task_changed = True
 
+            # Only fetch the page body when the page was edited since it was last read
+            if not task_edited_time or task_data.get('notion_edited_time') != task_edited_time:
+                page_description = get_notion_description(task_id)
+                page_description_hash = hash_description(page_description)
+                if 'description_hash' not in task_data:
+                    # First time this page body is seen, so keep it along with any local description
+                    task_description = merge_descriptions(page_description, task_data.get('description', ''))
+                elif page_description_hash != task_data['description_hash']:
+                    # The page body was edited in Notion
+                    task_description = page_description
+                else:
+                    # A local change not yet pushed to Notion wins over the unchanged page body
+                    task_description = task_data.get('description', '')
+                if task_data.get('description', '') != task_description:
+                    task_data['description'] = task_description
+                    task_changed = True
+
+                notion_edited_time = settled_edit_time(task_edited_time) if task_edited_time else None
+                if task_data.get('description_hash') != page_description_hash or task_data.get('notion_edited_time') != notion_edited_time:
+                    # Bookkeeping only, so the task is saved without being synced again
+                    task_data['description_hash'] = page_description_hash
+                    task_data['notion_edited_time'] = notion_edited_time
+                    modified = True
+
             if task_changed:
                 task_data['last_modified'] = datetime.now(timezone.utc).astimezone(GMT_PLUS_8).isoformat()
                 modified = True
 
         else:
+            task_description = get_notion_description(task_id)
+
             # Create a task in Todoist and get the task ID - using the pre-fetched lists
-            todoist_task_id, is_completed = create_todoist_task(task_name, existing_todoist_tasks, completed_todoist_tasks)
+            todoist_task_id, is_completed = create_todoist_task(task_name, task_description, existing_todoist_tasks, completed_todoist_tasks)
             
             # Prepare updates for Notion
             updates = {}
@@ -135,6 +163,9 @@ def sync_notion_to_json():
                 'completed': task_completed,
                 'due_date': task_due_date,
                 'labels': task_labels,
+                'description': task_description,
+                'description_hash': hash_description(task_description),
+                'notion_edited_time': settled_edit_time(task_edited_time) if task_edited_time else None,
                 'last_modified': datetime.now(timezone.utc).astimezone(GMT_PLUS_8).isoformat()
             }
 
@@ -152,7 +183,7 @@ def sync_notion_to_json():
     if modified:
         if save_tasks_to_json(tasks, "Notion"):
             # Only run sync if changes were saved
-            sync_local_tasks_to_notion_and_todoist()
+            sync_local_tasks_to_notion_and_todoist(tasks)
 
 # Run the main function
 if __name__ == "__main__":
@@ -1,12 +1,24 @@
-import subprocess
+import queue
 import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter.scrolledtext import ScrolledText
 import threading
+import traceback
 import os
+from contextlib import redirect_stdout, redirect_stderr
 from dotenv import load_dotenv
 
+# Seconds to wait between sync cycles
+CYCLE_INTERVAL = 4
+
+# How often the Tk main loop drains the log queue, and how much it takes at once
+DRAIN_INTERVAL_MS = 100
+MAX_LINES_PER_DRAIN = 500
+
+# Older output is dropped beyond this many lines
+MAX_LOG_LINES = 5000
+
 def check_env_variables():
     load_dotenv()  # Load environment variables from .env file
     
@@ -49,64 +61,137 @@ def check_env_variables():
         
         window.mainloop()
 
-def run_script(script_name, output_widget):
-    """Run a Python script and display its output in the GUI."""
-    try:
-        process = subprocess.Popen(["python", script_name], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                output_widget.insert(tk.END, output)
-                output_widget.see(tk.END)  # Scroll to the bottom
-                output_widget.update_idletasks()  # Update the GUI
-        return process.poll()
-    except subprocess.CalledProcessError as e:
-        if e.returncode == 1:
-            output_widget.insert(tk.END, "Error: Invalid Notion API token. Please check your NOTION_API_TOKEN environment variable.\n")
-        elif e.returncode == 2:
-            output_widget.insert(tk.END, "Error: Invalid Notion Database ID. Please check your NOTION_DATABASE_ID environment variable.\n")
-        elif e.returncode == 3:
-            output_widget.insert(tk.END, "Error: Invalid Todoist API token. Please check your TODOIST_API_TOKEN environment variable.\n")
-        return None
-
-def start_services(output_widget):
+class QueueWriter:
+    """File-like object that forwards complete lines to a queue."""
+
+    def __init__(self, log_queue):
+        self.log_queue = log_queue
+        self.buffer = ''
+
+    def write(self, text):
+        self.buffer += text
+        if '\n' in self.buffer:
+            lines, self.buffer = self.buffer.rsplit('\n', 1)
+            self.log_queue.put(('log', lines + '\n'))
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            self.log_queue.put(('log', self.buffer))
+            self.buffer = ''
+
+def start_services(log_queue, stop_event):
+    """Run sync cycles in-process until stopped, reporting output and stats through the queue."""
+    writer = QueueWriter(log_queue)
+    stats = {'cycles': 0, 'errors': 0, 'last_cycle': 0.0, 'tasks': 0, 'status': 'Running'}
     try:
-        # Run Notion_to_Local.py
-        output_widget.insert(tk.END, "Running Notion_to_Local.py...\n")
-        result = run_script("Notion_to_Local.py", output_widget)
-        if result is None:
-            return
-        time.sleep(4)
-        
-        # Run Todoist_to_Local.py
-        output_widget.insert(tk.END, "Running Todoist_to_Local.py...\n")
-        result = run_script("Todoist_to_Local.py", output_widget)
-        if result is None:
-            return
-        time.sleep(4)
-        
-    except KeyboardInterrupt:
-        output_widget.insert(tk.END, "Exiting gracefully...\n")
+        with redirect_stdout(writer), redirect_stderr(writer):
+            try:
+                # Imported here so the sync modules only load after the API keys are saved
+                from main import DIRECTIONS, run_module
+                from helper import load_tasks_from_json
+
+                while not stop_event.is_set():
+                    started = time.perf_counter()
+                    for name, module_name, function_name in DIRECTIONS.values():
+                        print(f"Syncing from {name} to local...")
+                        if not run_module(module_name, function_name):
+                            stats['errors'] += 1
+                            stop_event.set()
+                            break
+                    stats['cycles'] += 1
+                    stats['last_cycle'] = time.perf_counter() - started
+                    stats['tasks'] = len(load_tasks_from_json())
+                    log_queue.put(('stats', dict(stats)))
+                    # Sleep between cycles, waking up early when stopped
+                    stop_event.wait(CYCLE_INTERVAL)
+            except (Exception, SystemExit) as e:
+                # Errors outside the sync steps, e.g. a corrupt tasks.json, stop the worker like a failed step
+                print(f"Error running sync: {str(e)}")
+                traceback.print_exc()
+                stats['errors'] += 1
+            finally:
+                writer.flush()
+    finally:
+        # Always report the stop so the status label never stays on "Running"
+        stats['status'] = 'Stopped'
+        log_queue.put(('stats', dict(stats)))
 
 def create_gui():
     window = tk.Tk()
     window.title("Sync Notion and Todoist")
-    
+
     frame = ttk.Frame(window, padding="10")
     frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-    
+
     output_widget = ScrolledText(frame, height=20, width=60)
-    output_widget.grid(row=0, column=0, padx=5, pady=5)
-    
+    output_widget.grid(row=0, column=0, columnspan=2, padx=5, pady=5)
+
+    stats_label = ttk.Label(frame, text="Idle")
+    stats_label.grid(row=1, column=0, columnspan=2, sticky=tk.W, padx=5)
+
+    log_queue = queue.Queue()
+    stop_event = threading.Event()
+    worker = None
+
+    def drain_queue():
+        """Move queued output into the widget in one batch, on the Tk main loop."""
+        lines = []
+        try:
+            for _ in range(MAX_LINES_PER_DRAIN):
+                kind, value = log_queue.get_nowait()
+                if kind == 'log':
+                    lines.append(value)
+                else:
+                    stats_label.config(text=(
+                        f"{value['status']} | cycles: {value['cycles']} | "
+                        f"last cycle: {value['last_cycle']:.1f}s | tasks: {value['tasks']} | errors: {value['errors']}"
+                    ))
+        except queue.Empty:
+            pass
+
+        if lines:
+            output_widget.insert(tk.END, ''.join(lines))
+            # Keep the widget small so long runs don't slow down the UI
+            line_count = int(output_widget.index('end-1c').split('.')[0])
+            if line_count > MAX_LOG_LINES:
+                output_widget.delete('1.0', f'{line_count - MAX_LOG_LINES}.0')
+            output_widget.see(tk.END)
+        # Start stays disabled until a stopped worker has finished its current cycle
+        start_button.state(['disabled'] if worker and worker.is_alive() else ['!disabled'])
+        window.after(DRAIN_INTERVAL_MS, drain_queue)
+
     def start_services_thread():
-        thread = threading.Thread(target=start_services, args=(output_widget,))
-        thread.start()
-    
+        nonlocal worker
+        if worker and worker.is_alive():
+            return
+        stop_event.clear()
+        start_button.state(['disabled'])
+        stats_label.config(text="Running")
+        # Not a daemon, so closing the window never cuts off a write to tasks.json
+        worker = threading.Thread(target=start_services, args=(log_queue, stop_event))
+        worker.start()
+
+    def stop_services():
+        stop_event.set()
+        stats_label.config(text="Stopping after the current cycle...")
+
     start_button = ttk.Button(frame, text="Start", command=start_services_thread)
-    start_button.grid(row=1, column=0, padx=5, pady=5)
-    
+    start_button.grid(row=2, column=0, padx=5, pady=5)
+
+    stop_button = ttk.Button(frame, text="Stop", command=stop_services)
+    stop_button.grid(row=2, column=1, padx=5, pady=5)
+
+    def close_window():
+        """Let the current cycle finish before closing, without blocking the main loop."""
+        if worker and worker.is_alive():
+            stop_services()
+            window.after(DRAIN_INTERVAL_MS, close_window)
+            return
+        window.destroy()
+
+    window.protocol("WM_DELETE_WINDOW", close_window)
+    window.after(DRAIN_INTERVAL_MS, drain_queue)
     window.mainloop()
 
 if __name__ == "__main__":
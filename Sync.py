@@ -1,8 +1,7 @@
+import difflib
 import json
 import os
 from datetime import datetime, timezone
-from dateutil.parser import parse
-import requests
 from helper import *
 
 # Function to delete a task in Notion
@@ -31,12 +30,94 @@ def delete_todoist_task(task_id):
         else:
             raise
 
+# Function to update the text of a block in Notion, keeping its type
+def update_notion_block(block, text):
+    url = f'https://api.notion.com/v1/blocks/{block["id"]}'
+    payload = {block['type']: {'rich_text': to_rich_text(text)}}
+    response = requests.patch(url, headers=notion_headers, data=json.dumps(payload))
+    response.raise_for_status()
+
+# Function to delete a block in Notion
+def delete_notion_block(block_id):
+    url = f'https://api.notion.com/v1/blocks/{block_id}'
+    try:
+        response = requests.delete(url, headers=notion_headers)
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 404:
+            print(f"Block with ID {block_id} not found in Notion, skipping deletion.")
+        else:
+            raise
+
+# Function to get the block operations turning the old lines into the new ones
+def diff_description_lines(old_lines, new_lines):
+    opcodes = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes()
+    # Notion can only insert blocks after another block, so an insert before the
+    # first existing block is folded into a replacement of that block
+    if old_lines and opcodes and opcodes[0][0] == 'insert':
+        _, _, _, _, inserted_end = opcodes[0]
+        tag, _, old_end, _, new_end = opcodes[1]
+        if tag == 'equal':
+            opcodes[:2] = [('replace', 0, 1, 0, inserted_end + 1)]
+            if old_end > 1:
+                opcodes.insert(1, ('equal', 1, old_end, inserted_end + 1, new_end))
+        else:
+            opcodes[:2] = [('replace', 0, old_end, 0, new_end)]
+    return opcodes
+
+# Function to sync a task description to the body of its Notion page
+def sync_notion_description(task):
+    description = task.get('description', '')
+    description_hash = hash_description(description)
+    # Skip fetching the blocks when the body already matches the description
+    if task.get('description_hash') == description_hash:
+        return
+
+    page_id = task['notion-id']
+    blocks = get_notion_text_blocks(page_id)
+
+    # With no record of the page body, e.g. for tasks saved before descriptions were
+    # synced, the body is kept and the local description is only added after it
+    if 'description_hash' not in task:
+        page_description = '\n'.join(block['text'] for block in blocks)
+        description = merge_descriptions(page_description, description)
+        task['description'] = description
+        task['description_hash'] = hash_description(page_description)
+        if description == page_description:
+            return
+        description_hash = hash_description(description)
+
+    lines = description.split('\n') if description else []
+    previous_block_id = None
+    for tag, old_start, old_end, new_start, new_end in diff_description_lines([block['text'] for block in blocks], lines):
+        old_blocks = blocks[old_start:old_end]
+        new_lines = lines[new_start:new_end]
+        if tag == 'equal':
+            previous_block_id = old_blocks[-1]['id']
+            continue
+
+        # Reuse changed blocks in place, then delete or append whatever is left over
+        for block, line in zip(old_blocks, new_lines):
+            update_notion_block(block, line)
+            previous_block_id = block['id']
+        for block in old_blocks[len(new_lines):]:
+            delete_notion_block(block['id'])
+        added_lines = new_lines[len(old_blocks):]
+        if added_lines:
+            block_ids = append_notion_blocks(page_id, [to_paragraph_block(line) for line in added_lines], after=previous_block_id)
+            if block_ids:
+                previous_block_id = block_ids[-1]
+
+    task['description_hash'] = description_hash
+    print(f"Description of task '{task['name']}' synced successfully to Notion")
+
 # Function to create or update a task in Notion
 def sync_notion_task(task):
     # Only sync if task was modified after last synced time
     last_synced_time = get_last_synced_time()
     if last_synced_time and task['last_modified'] <= last_synced_time:
         return
+    from dateutil.parser import parse
 
     url = f'https://api.notion.com/v1/pages/{task["notion-id"]}'
     payload = {
@@ -61,18 +142,30 @@ def sync_notion_task(task):
     response.raise_for_status()
     print(f"Task '{task['name']}' synced successfully to Notion")
 
+    sync_notion_description(task)
+
 # Function to create or update a task in Todoist
 def sync_todoist_task(task):
     # Only sync if task was modified after last synced time
     last_synced_time = get_last_synced_time()
     if last_synced_time and task['last_modified'] <= last_synced_time:
         return
+    from dateutil.parser import parse
 
     url = f'https://api.todoist.com/rest/v2/tasks/{task["todoist-id"]}' if task['todoist-id'] else 'https://api.todoist.com/rest/v2/tasks'
     payload = {
         'content': task['name'],
         'labels': task['labels']
     }
+    # With no record of the Todoist description, e.g. for tasks saved before descriptions
+    # were synced, it is kept and added after the local description on both services
+    if task['todoist-id'] and 'todoist_description_hash' not in task:
+        description = merge_descriptions(task.get('description', ''), get_todoist_description(task['todoist-id']))
+        if description != task.get('description', ''):
+            task['description'] = description
+            sync_notion_description(task)
+    if 'description' in task:
+        payload['description'] = task['description']
 
     if task['due_date']:
         due_date_obj = parse(task['due_date'])
@@ -94,6 +187,8 @@ def sync_todoist_task(task):
             response = requests.post('https://api.todoist.com/rest/v2/tasks', headers=todoist_headers, data=json.dumps(payload))
         response.raise_for_status()
         print(f"Task '{task['name']}' synced successfully to Todoist")
+        if 'description' in payload:
+            task['todoist_description_hash'] = hash_description(payload['description'])
 
         # Update the completed status separately
         if task['completed']:
@@ -105,7 +200,19 @@ def sync_todoist_task(task):
             print(f"Task with ID {task['todoist-id']} not found in Todoist, skipping sync.")
         else:
             raise
-        
+
+# Function to get the description of a task in Todoist
+def get_todoist_description(task_id):
+    url = f'https://api.todoist.com/rest/v2/tasks/{task_id}'
+    try:
+        response = requests.get(url, headers=todoist_headers)
+        response.raise_for_status()
+        return response.json().get('description', '')
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 404:
+            return ''
+        raise
+
 # Function to mark a task as completed in Todoist
 def complete_todoist_task(task_id):
     url = f'https://api.todoist.com/rest/v2/tasks/{task_id}/close'
@@ -131,8 +238,10 @@ def reopen_todoist_task(task_id):
             raise
 
 # Main function to sync tasks from local JSON file to Notion and Todoist
-def sync_local_tasks_to_notion_and_todoist():
-    tasks = load_tasks_from_json()
+def sync_local_tasks_to_notion_and_todoist(tasks=None):
+    # Callers pass the tasks they just saved, which a dry run keeps only in memory
+    if tasks is None:
+        tasks = load_tasks_from_json()
     tasks_to_keep = []
     changes_made = False
 
@@ -158,10 +267,9 @@ def sync_local_tasks_to_notion_and_todoist():
             tasks_to_keep.append(task)
 
     # Only save if we actually made changes
-    if tasks_to_keep != tasks:
-        # Save the updated list of tasks to the local JSON file
+    if changes_made:
+        # Save the updated list of tasks, including the description hashes recorded while syncing
         save_tasks_to_json(tasks_to_keep)
-        changes_made = True
     
     # Only update the last synced time if changes were made
     if changes_made:
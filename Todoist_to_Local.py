@@ -1,13 +1,11 @@
 import json
 import os
-import subprocess
-import pytz
 from datetime import datetime, timezone, timedelta
 from helper import *
 from Sync import sync_local_tasks_to_notion_and_todoist
 
 # Define the GMT+8 timezone
-GMT_PLUS_8 = pytz.timezone('Etc/GMT-8')
+GMT_PLUS_8 = timezone(timedelta(hours=8))
 
 # Function to create a task in Notion
 def create_notion_task(task_name, task_description, task_due_date, todoist_task_id, notion_tasks_id_dict, task_labels):
@@ -17,6 +15,7 @@ def create_notion_task(task_name, task_description, task_due_date, todoist_task_
         return
 
     url = 'https://api.notion.com/v1/pages'
+    description_blocks = description_to_blocks(task_description)
     payload = {
         'parent': {'database_id': NOTION_DATABASE_ID},
         'properties': {
@@ -24,7 +23,8 @@ def create_notion_task(task_name, task_description, task_due_date, todoist_task_
             'Done': {'checkbox': False},
             'ID': {'number': int(todoist_task_id)},
             'Type': {'multi_select': [{'name': label} for label in task_labels]}
-        }
+        },
+        'children': description_blocks[:NOTION_CHILDREN_LIMIT]
     }
     if task_due_date:
         if task_due_date.endswith('Z'):
@@ -35,13 +35,17 @@ def create_notion_task(task_name, task_description, task_due_date, todoist_task_
         if due_date_obj.tzinfo is None:
             # Assume the local time is in a specific timezone, e.g., GMT+08:00
             local_tz = GMT_PLUS_8
-            due_date_obj = local_tz.localize(due_date_obj)
+            due_date_obj = due_date_obj.replace(tzinfo=local_tz)
         task_due_date = due_date_obj.astimezone(GMT_PLUS_8).strftime('%Y-%m-%dT%H:%M:%S%z')
         task_due_date = task_due_date[:-2] + ':' + task_due_date[-2:]
         payload['properties']['Date'] = {'date': {'start': task_due_date}}
     
     response = requests.post(url, headers=notion_headers, data=json.dumps(payload))
     response.raise_for_status()
+
+    # Notion only accepts a limited number of blocks when creating a page
+    if len(description_blocks) > NOTION_CHILDREN_LIMIT:
+        append_notion_blocks(response.json()['id'], description_blocks[NOTION_CHILDREN_LIMIT:])
     print(f"Task '{task_name}' created successfully in Notion")
 
 # Main function
@@ -77,7 +81,7 @@ def sync_todoist_to_json():
                 if due_date_obj.tzinfo is None:
                     # Assume the local time is in a specific timezone, e.g., GMT+08:00
                     local_tz = GMT_PLUS_8
-                    due_date_obj = local_tz.localize(due_date_obj)
+                    due_date_obj = due_date_obj.replace(tzinfo=local_tz)
                 task_due_date = due_date_obj.astimezone(GMT_PLUS_8).strftime('%Y-%m-%dT%H:%M:%S%z')
                 # Adjust the format to include the colon in the timezone offset
                 task_due_date = task_due_date[:-2] + ':' + task_due_date[-2:]
@@ -101,6 +105,25 @@ def sync_todoist_to_json():
             if task['name'] != todoist_task['content']:
                 task['name'] = todoist_task['content']
                 task_changed = True
+
+            todoist_description = todoist_task.get('description', '')
+            todoist_description_hash = hash_description(todoist_description)
+            if 'todoist_description_hash' not in task:
+                # First time this description is seen, so keep it along with any local description
+                task_description = merge_descriptions(task.get('description', ''), todoist_description)
+            elif todoist_description_hash != task['todoist_description_hash']:
+                # The description was edited in Todoist
+                task_description = todoist_description
+            else:
+                # A local change not yet pushed to Todoist wins over the unchanged description
+                task_description = task.get('description', '')
+            if task.get('description', '') != task_description:
+                task['description'] = task_description
+                task_changed = True
+            if task.get('todoist_description_hash') != todoist_description_hash:
+                # Bookkeeping only, so the task is saved without being synced again
+                task['todoist_description_hash'] = todoist_description_hash
+                modified = True
             
             # Check if 'due' attribute exists and is not None
             if 'due' in todoist_task and todoist_task['due'] is not None:
@@ -115,7 +138,7 @@ def sync_todoist_to_json():
                     if due_date_obj.tzinfo is None:
                         # Assume the local time is in a specific timezone, e.g., GMT+08:00
                         local_tz = GMT_PLUS_8
-                        due_date_obj = local_tz.localize(due_date_obj)
+                        due_date_obj = due_date_obj.replace(tzinfo=local_tz)
                     due_date = due_date_obj.astimezone(GMT_PLUS_8).strftime('%Y-%m-%dT%H:%M:%S%z')
                     # Adjust the format to include the colon in the timezone offset
                     due_date = due_date[:-2] + ':' + due_date[-2:]
@@ -146,7 +169,7 @@ def sync_todoist_to_json():
     if modified:
         if save_tasks_to_json(tasks, "Todoist"):
             # Only run sync if changes were saved
-            sync_local_tasks_to_notion_and_todoist()
+            sync_local_tasks_to_notion_and_todoist(tasks)
 
 # Run the main function
 if __name__ == "__main__":
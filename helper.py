@@ -1,13 +1,33 @@
-import requests
+import hashlib
+import importlib.util
 import json
 import os
 import sys
-import subprocess
-from datetime import datetime, timezone
-from dotenv import load_dotenv
+from datetime import datetime, timezone, timedelta
+import traffic
 
-# Load environment variables from .env file
-load_dotenv()
+# Function to import a module on first attribute access instead of right away
+def lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# requests is slow to import and not needed until the first API call
+requests = lazy_import('requests')
+
+# Load environment variables from .env file, skipped when they are already set since dotenv is slow to import
+if not all(os.getenv(name) for name in ('NOTION_API_TOKEN', 'NOTION_DATABASE_ID', 'TODOIST_API_TOKEN')):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+# Record or replay API traffic when SYNC_CAPTURE_FILE or SYNC_REPLAY_FILE is set
+traffic.install_from_env()
 
 # Configuration
 NOTION_API_TOKEN = os.getenv('NOTION_API_TOKEN')
@@ -28,6 +48,17 @@ todoist_headers = {
 # Constants
 TASKS_FILE = 'tasks.json'
 LAST_SYNCED_FILE = 'last_synced_time.json'
+WATERMARK_FILE = 'watermark.json'
+
+# Notion is re-read in full at least this often, since the change check cannot see deleted pages
+WATERMARK_MAX_AGE = timedelta(hours=1)
+
+# Notion API limits for rich text length and number of blocks per request
+NOTION_RICH_TEXT_LIMIT = 2000
+NOTION_CHILDREN_LIMIT = 100
+
+# When set, nothing is written to the APIs or to the local files
+DRY_RUN = os.getenv(traffic.DRY_RUN_ENV) == '1'
 
 # Function to clear the console
 def cls():
@@ -77,6 +108,8 @@ def get_last_synced_time():
 
 # Function to save last synced time to JSON file
 def save_last_synced_time():
+    if DRY_RUN:
+        return
     data = {'last_synced_time': datetime.now(timezone.utc).isoformat()}
     with open(LAST_SYNCED_FILE, 'w') as file:
         json.dump(data, file)
@@ -91,6 +124,9 @@ def save_tasks_to_json(tasks, source=""):
 
     # Only save if there are actual changes
     if tasks != existing_tasks:
+        if DRY_RUN:
+            print(f"Dry run: update from {source or 'local'} not saved to {TASKS_FILE}.")
+            return True
         with open(TASKS_FILE, 'w', encoding='utf-8') as file:
             json.dump(tasks, file, ensure_ascii=False, indent=2, default=str)
         if source:
@@ -113,4 +149,140 @@ def load_tasks_from_json():
     for task in tasks:
         if 'deleted' not in task:
             task['deleted'] = False
-    return tasks
\ No newline at end of file
+    return tasks
+
+# Function to check if any local task still has to be pushed to Notion and Todoist
+def has_local_changes():
+    last_synced_time = get_last_synced_time()
+    tasks = load_tasks_from_json()
+    if not last_synced_time:
+        return bool(tasks)
+    # Compare as datetimes since tasks are stamped in more than one timezone
+    last_synced_time = datetime.fromisoformat(last_synced_time)
+    for task in tasks:
+        if task['deleted'] or datetime.fromisoformat(task['last_modified']) > last_synced_time:
+            return True
+    return False
+
+# Function to load the change check watermark from JSON file
+def load_watermark():
+    try:
+        with open(WATERMARK_FILE, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+# Function to save the change check watermark to JSON file
+def save_watermark(watermark):
+    if DRY_RUN:
+        return
+    with open(WATERMARK_FILE, 'w') as file:
+        json.dump(watermark, file)
+
+# Function to check if any Notion task was edited since the given time
+def notion_changed_since(timestamp):
+    # Notion rounds last_edited_time down to the minute
+    since = datetime.fromisoformat(timestamp) - timedelta(minutes=1)
+    url = f'https://api.notion.com/v1/databases/{NOTION_DATABASE_ID}/query'
+    payload = {
+        'filter': {'timestamp': 'last_edited_time', 'last_edited_time': {'on_or_after': since.isoformat()}},
+        'page_size': 1
+    }
+    response = requests.post(url, headers=notion_headers, data=json.dumps(payload))
+    if response.status_code == 401:
+        print("Error: Invalid Notion API token. Please check your NOTION_API_TOKEN environment variable.")
+        sys.exit(1)
+    if response.status_code == 400:
+        print("Error: Invalid Notion Database ID. Please check your NOTION_DATABASE_ID environment variable.")
+        sys.exit(2)
+    response.raise_for_status()
+    return bool(response.json().get('results'))
+
+# Function to get the Todoist tasks changed since the given sync token
+def get_todoist_changes(sync_token):
+    url = 'https://api.todoist.com/sync/v9/sync'
+    payload = {'sync_token': sync_token or '*', 'resource_types': ['items']}
+    response = requests.post(url, headers=todoist_headers, data=json.dumps(payload))
+    if response.status_code == 401:
+        print("Error: Invalid Todoist API token. Please check your TODOIST_API_TOKEN environment variable.")
+        sys.exit(3)
+    response.raise_for_status()
+    data = response.json()
+    return data.get('items', []), data['sync_token']
+
+# Function to hash a description so unchanged page bodies can be skipped
+def hash_description(description):
+    return hashlib.sha256((description or '').encode('utf-8')).hexdigest()
+
+# Function to combine the descriptions of both services the first time they are compared, so neither is lost
+def merge_descriptions(first, second):
+    if not first:
+        return second
+    if not second or second == first:
+        return first
+    return f"{first}\n{second}"
+
+# Function to split a line of text into Notion rich text objects
+def to_rich_text(line):
+    return [
+        {'type': 'text', 'text': {'content': line[start:start + NOTION_RICH_TEXT_LIMIT]}}
+        for start in range(0, len(line), NOTION_RICH_TEXT_LIMIT)
+    ]
+
+# Function to create a Notion paragraph block for a line of text
+def to_paragraph_block(line):
+    return {'object': 'block', 'type': 'paragraph', 'paragraph': {'rich_text': to_rich_text(line)}}
+
+# Function to convert a description into Notion blocks, one paragraph per line
+def description_to_blocks(description):
+    if not description:
+        return []
+    return [to_paragraph_block(line) for line in description.split('\n')]
+
+# Function to get the last edit time of a Notion page once no more edits can hide behind it
+def settled_edit_time(last_edited_time):
+    # Notion rounds last_edited_time down to the minute, so edits later in the same minute keep the same value
+    edited = datetime.fromisoformat(last_edited_time.replace('Z', '+00:00'))
+    if datetime.now(timezone.utc) - edited >= timedelta(minutes=1):
+        return last_edited_time
+    return None
+
+# Function to get the text blocks of a Notion page body
+def get_notion_text_blocks(page_id):
+    url = f'https://api.notion.com/v1/blocks/{page_id}/children'
+    params = {'page_size': NOTION_CHILDREN_LIMIT}
+    blocks = []
+    while True:
+        response = requests.get(url, headers=notion_headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+        for block in data['results']:
+            content = block.get(block['type'], {})
+            # Only blocks holding text make up the description, others such as images are left alone
+            if 'rich_text' in content:
+                text = ''.join(item.get('plain_text', item.get('text', {}).get('content', '')) for item in content['rich_text'])
+                blocks.append({'id': block['id'], 'type': block['type'], 'text': text})
+        if not data.get('has_more'):
+            return blocks
+        params['start_cursor'] = data['next_cursor']
+
+# Function to get the body of a Notion page as a description
+def get_notion_description(page_id):
+    return '\n'.join(block['text'] for block in get_notion_text_blocks(page_id))
+
+# Function to append blocks to a Notion page, optionally after a given block
+def append_notion_blocks(page_id, blocks, after=None):
+    url = f'https://api.notion.com/v1/blocks/{page_id}/children'
+    block_ids = []
+    for start in range(0, len(blocks), NOTION_CHILDREN_LIMIT):
+        payload = {'children': blocks[start:start + NOTION_CHILDREN_LIMIT]}
+        if after:
+            payload['after'] = after
+        response = requests.patch(url, headers=notion_headers, data=json.dumps(payload))
+        response.raise_for_status()
+        block_ids.extend(block['id'] for block in response.json().get('results', []))
+        # Keep later chunks in order behind the ones just added
+        if block_ids:
+            after = block_ids[-1]
+    return block_ids
+
@@ -1,19 +1,31 @@
+import argparse
 import time
 import importlib
+import os
 import sys
 import traceback
+from contextlib import nullcontext
+from datetime import datetime, timezone
+import traffic
 
-def run_module(module_name):
-    """Run a Python module by importing it and handling any errors."""
+# Sync steps for each direction, in the order they run
+DIRECTIONS = {
+    'notion': ("Notion", "Notion_to_Local", "sync_notion_to_json"),
+    'todoist': ("Todoist", "Todoist_to_Local", "sync_todoist_to_json"),
+}
+
+def run_module(module_name, function_name):
+    """Run a sync step by importing its module and calling its main function."""
     try:
         # Import the module dynamically
         module = importlib.import_module(module_name)
+        getattr(module, function_name)()
         print(f"Successfully executed {module_name}")
         return True
-    except Exception as e:
+    except (Exception, SystemExit) as e:
         print(f"Error executing {module_name}: {str(e)}")
         traceback.print_exc()
-        
+
         if isinstance(e, SystemExit):
             if e.code == 1:
                 print("Error: Invalid Notion API token. Please check your NOTION_API_TOKEN environment variable.")
@@ -21,26 +33,120 @@ def run_module(module_name):
                 print("Error: Invalid Notion Database ID. Please check your NOTION_DATABASE_ID environment variable.")
             elif e.code == 3:
                 print("Error: Invalid Todoist API token. Please check your TODOIST_API_TOKEN environment variable.")
-            
+
+        return False
+
+def find_changed_directions(helper, directions, watermark, force=False):
+    """Return the directions with remote changes and the new Todoist sync token."""
+    changed = []
+    todoist_sync_token = None
+
+    if 'notion' in directions:
+        last_checked = watermark.get('notion')
+        stale = not last_checked or datetime.now(timezone.utc) - datetime.fromisoformat(last_checked) > helper.WATERMARK_MAX_AGE
+        if force or stale or helper.notion_changed_since(last_checked):
+            changed.append('notion')
+
+    if 'todoist' in directions:
+        todoist_changes, todoist_sync_token = helper.get_todoist_changes(watermark.get('todoist_sync_token'))
+        if force or todoist_changes:
+            changed.append('todoist')
+
+    return changed, todoist_sync_token
+
+def sync_once(directions, force=False):
+    """Run one sync, returning early when the change check finds nothing to do."""
+    import helper
+
+    watermark = helper.load_watermark()
+    started = datetime.now(timezone.utc).isoformat()
+    try:
+        changed, todoist_sync_token = find_changed_directions(helper, directions, watermark, force)
+    except (Exception, SystemExit) as e:
+        print(f"Error checking for changes: {str(e)}")
         return False
 
+    if not changed and not helper.has_local_changes():
+        print("No changes since last sync, nothing to do")
+        return True
+
+    for direction in directions:
+        if direction not in changed:
+            continue
+        name, module_name, function_name = DIRECTIONS[direction]
+        print(f"\nSyncing from {name} to local...")
+        if not run_module(module_name, function_name):
+            return False
+
+    # Push local changes the direction steps did not pick up, e.g. after an interrupted run
+    if helper.has_local_changes():
+        if helper.DRY_RUN and changed:
+            # tasks.json still holds the state from before the direction steps, whose pushes were already shown
+            print("\nDry run: skipping the push of pending local changes from tasks.json")
+            return True
+        print("\nSyncing local changes to Notion and Todoist...")
+        if not run_module("Sync", "sync_local_tasks_to_notion_and_todoist"):
+            return False
+
+    if 'notion' in changed:
+        watermark['notion'] = started
+    if todoist_sync_token:
+        watermark['todoist_sync_token'] = todoist_sync_token
+    helper.save_watermark(watermark)
+    return True
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sync Notion and Todoist.")
+    parser.add_argument('--once', action='store_true',
+                        help="run a single sync and exit instead of syncing forever")
+    parser.add_argument('--direction', choices=['both', *DIRECTIONS], default='both',
+                        help="which source to sync from (default: both)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="show what would change without writing to the APIs or local files")
+    parser.add_argument('--force', action='store_true',
+                        help="with --once, sync even if the change check finds nothing to do")
+    parser.add_argument('--profile-every', type=int, default=None, metavar='N',
+                        help="profile every Nth cycle with cProfile and tracemalloc (0 disables)")
+    parser.add_argument('--profile-dir', default=None,
+                        help="directory where profiling reports are written")
+    parser.add_argument('--profile-trace-continuous', action='store_true', default=None,
+                        help="keep tracemalloc on between profiled cycles to report memory growth (slows every cycle)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    directions = list(DIRECTIONS) if args.direction == 'both' else [args.direction]
+    if args.dry_run:
+        # Read by helper when it is first imported
+        os.environ[traffic.DRY_RUN_ENV] = '1'
+
+    if args.once:
+        # Profiling is only imported when asked for, to keep one-shot runs fast
+        profile_every = args.profile_every if args.profile_every is not None else int(os.getenv('SYNC_PROFILE_EVERY', '0'))
+        if profile_every > 0:
+            from profiling import profiler_from_env
+            cycle = profiler_from_env(1, args.profile_dir, args.profile_trace_continuous).cycle()
+        else:
+            cycle = nullcontext()
+        with cycle:
+            succeeded = sync_once(directions, args.force)
+        sys.exit(0 if succeeded else 1)
+
+    from profiling import profiler_from_env
+    profiler = profiler_from_env(args.profile_every, args.profile_dir, args.profile_trace_continuous)
     try:
         while True:
-            # Run Notion_to_Local directly
-            print("\nSyncing from Notion to local...")
-            if not run_module("Notion_to_Local"):
-                break
-            time.sleep(4)
-            
-            # Run Todoist_to_Local directly
-            print("\nSyncing from Todoist to local...")
-            if not run_module("Todoist_to_Local"):
-                break
-            time.sleep(4)
-            
+            # Sleeping stays outside the profiled block so it does not dominate the report
+            with profiler.cycle():
+                for direction in directions:
+                    name, module_name, function_name = DIRECTIONS[direction]
+                    print(f"\nSyncing from {name} to local...")
+                    if not run_module(module_name, function_name):
+                        return
+            time.sleep(4 * len(directions))
+
     except KeyboardInterrupt:
         print("\nExiting gracefully...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,144 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import shutil
+import signal
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Environment variables controlling profiling
+PROFILE_EVERY_ENV = 'SYNC_PROFILE_EVERY'
+PROFILE_DIR_ENV = 'SYNC_PROFILE_DIR'
+PROFILE_KEEP_ENV = 'SYNC_PROFILE_KEEP'
+PROFILE_TRACE_CONTINUOUS_ENV = 'SYNC_PROFILE_TRACE_CONTINUOUS'
+
+# Defaults
+DEFAULT_PROFILE_DIR = 'profiles'
+DEFAULT_PROFILE_KEEP = 20
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 10
+
+# Names of the report directories, the only ones rotation may delete
+REPORT_NAME_PATTERN = re.compile(r'\d{8}-\d{6}-cycle\d{6,}')
+
+# Allocations made by the profiling machinery itself are left out of reports
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+class CycleProfiler:
+    """Wrap sync cycles in cProfile and tracemalloc.
+
+    Every ``every``-th cycle is profiled, plus the next cycle after a
+    ``request()`` (sent by SIGUSR1 where available). Each profiled cycle
+    writes its CPU stats and the allocations made during the cycle to its
+    own directory. Only the ``keep`` most recent directories are kept.
+
+    Tracing stops after each profiled cycle, so other cycles run at full
+    speed. With ``trace_continuous`` it stays on from the first profiled
+    cycle, at a cost to every cycle, and each report also holds the memory
+    growth since the previous profiled cycle.
+    """
+
+    def __init__(self, directory=DEFAULT_PROFILE_DIR, every=0, keep=DEFAULT_PROFILE_KEEP, trace_continuous=False):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.trace_continuous = trace_continuous
+        self.cycle_count = 0
+        self.requested = False
+        self.previous_snapshot = None
+
+    # Function to profile the next cycle regardless of the schedule
+    def request(self, *args):
+        self.requested = True
+
+    # Function to profile the next cycle when the process receives SIGUSR1
+    def install_signal_handler(self):
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.request)
+
+    def _should_profile(self):
+        if self.requested:
+            return True
+        return self.every > 0 and self.cycle_count % self.every == 0
+
+    @contextmanager
+    def cycle(self):
+        self.cycle_count += 1
+        if not self._should_profile():
+            yield
+            return
+        self.requested = False
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            if not self.trace_continuous:
+                tracemalloc.stop()
+            self._write_report(profiler, before, after)
+            if self.trace_continuous:
+                self.previous_snapshot = after
+
+    def _write_report(self, profiler, before, after):
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        report_dir = os.path.join(self.directory, f"{timestamp}-cycle{self.cycle_count:06d}")
+        os.makedirs(report_dir, exist_ok=True)
+
+        profiler.dump_stats(os.path.join(report_dir, 'profile.prof'))
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        with open(os.path.join(report_dir, 'profile.txt'), 'w', encoding='utf-8') as file:
+            file.write(stream.getvalue())
+
+        _write_allocations(os.path.join(report_dir, 'allocations.txt'), after.compare_to(before, 'lineno'))
+        if self.previous_snapshot is not None:
+            _write_allocations(os.path.join(report_dir, 'growth.txt'), after.compare_to(self.previous_snapshot, 'lineno'))
+
+        self._rotate()
+        print(f"Profile of cycle {self.cycle_count} written to {report_dir}")
+
+    # Function to delete the oldest reports beyond the keep limit, leaving anything else in the directory alone
+    def _rotate(self):
+        reports = sorted(
+            name for name in os.listdir(self.directory)
+            if REPORT_NAME_PATTERN.fullmatch(name) and os.path.isdir(os.path.join(self.directory, name))
+        )
+        for name in reports[:max(len(reports) - self.keep, 0)]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+# Function to write the largest allocation differences to a text file
+def _write_allocations(path, differences):
+    with open(path, 'w', encoding='utf-8') as file:
+        for stat in differences[:TOP_ALLOCATIONS]:
+            file.write(f"{stat}\n")
+
+
+# Function to create a profiler from environment variables and CLI overrides
+def profiler_from_env(every=None, directory=None, trace_continuous=None):
+    if every is None:
+        every = int(os.getenv(PROFILE_EVERY_ENV, '0'))
+    if directory is None:
+        directory = os.getenv(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+    keep = int(os.getenv(PROFILE_KEEP_ENV, str(DEFAULT_PROFILE_KEEP)))
+    if trace_continuous is None:
+        trace_continuous = os.getenv(PROFILE_TRACE_CONTINUOUS_ENV) == '1'
+    profiler = CycleProfiler(directory, every, keep, trace_continuous)
+    profiler.install_signal_handler()
+    return profiler
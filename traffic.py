@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+# Environment variables controlling capture and replay
+CAPTURE_ENV = 'SYNC_CAPTURE_FILE'
+REPLAY_ENV = 'SYNC_REPLAY_FILE'
+REPLAY_LATENCY_ENV = 'SYNC_REPLAY_LATENCY'
+DRY_RUN_ENV = 'SYNC_DRY_RUN'
+
+# POST endpoints that only read data and are safe to call during a dry run
+READ_ONLY_POST_SUFFIXES = ('/query', '/sync/v9/sync')
+
+# Placeholders written in place of secrets and account specific values
+SECRET_PLACEHOLDER = '<redacted>'
+DATABASE_PLACEHOLDER = 'redacted-database-id'
+
+# Only these response headers are kept, everything else may identify the account
+KEPT_RESPONSE_HEADERS = ('Content-Type',)
+
+_original_send = None
+_lock = threading.Lock()
+
+
+class ReplayMissError(Exception):
+    """Raised when a request made during replay was never captured."""
+
+
+# Function to replace tokens and the database ID in captured text
+def _sanitize(text):
+    if not text:
+        return text
+    for secret in (os.getenv('NOTION_API_TOKEN'), os.getenv('TODOIST_API_TOKEN')):
+        if secret:
+            text = text.replace(secret, SECRET_PLACEHOLDER)
+    for database_id in _database_id_forms(os.getenv('NOTION_DATABASE_ID')):
+        text = text.replace(database_id, DATABASE_PLACEHOLDER)
+    return text
+
+
+# Function to get the dashed and undashed forms of a Notion database ID
+def _database_id_forms(database_id):
+    if not database_id:
+        return []
+    forms = [database_id]
+    undashed = database_id.replace('-', '')
+    # Notion IDs are UUIDs, usually copied without dashes but returned with them
+    if len(undashed) == 32:
+        dashed = f"{undashed[:8]}-{undashed[8:12]}-{undashed[12:16]}-{undashed[16:20]}-{undashed[20:]}"
+        forms += [undashed, dashed, undashed.lower(), dashed.lower()]
+    return list(dict.fromkeys(forms))
+
+
+# Function to decode a prepared request body into text
+def _body_text(body):
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        return body.decode('utf-8', errors='replace')
+    return str(body)
+
+
+# Function to build the key used to match a request against the capture
+def _request_key(method, url, body):
+    return f"{method.upper()} {_sanitize(url)} {_sanitize(_body_text(body)) or ''}"
+
+
+class Recorder:
+    """Append sanitized request/response pairs to a JSON lines file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, session, request, **kwargs):
+        started = time.perf_counter()
+        response = _original_send(session, request, **kwargs)
+        latency = time.perf_counter() - started
+
+        entry = {
+            'method': request.method,
+            'url': _sanitize(request.url),
+            'body': _sanitize(_body_text(request.body)),
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in KEPT_RESPONSE_HEADERS if name in response.headers},
+            'response': _sanitize(response.text),
+            'latency': latency
+        }
+        with _lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return response
+
+
+class Replayer:
+    """Serve captured responses back in the order they were recorded.
+
+    Requests are matched on method, URL and body, falling back to method and
+    URL for bodies that change between runs such as timestamp filters. When
+    the same request is made more often than it was captured, the last
+    captured response is served again so long-running loops can be replayed
+    indefinitely.
+    """
+
+    def __init__(self, path, latency='original'):
+        self.path = path
+        self.latency = latency
+        self.entries = {}
+        # Requests with a body, keyed on method and URL only, for bodies that change between runs
+        self.fallback_entries = {}
+        self.served = {}
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = _request_key(entry['method'], entry['url'], entry['body'])
+                self.entries.setdefault(key, []).append(entry)
+                if entry['body']:
+                    self.fallback_entries.setdefault(_request_key(entry['method'], entry['url'], None), []).append(entry)
+
+    def send(self, session, request, **kwargs):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        key = _request_key(request.method, request.url, request.body)
+        candidates = self.entries.get(key)
+        served_key = ('exact', key)
+        if not candidates and request.body:
+            key = _request_key(request.method, request.url, None)
+            candidates = self.fallback_entries.get(key)
+            served_key = ('fallback', key)
+        if not candidates:
+            raise ReplayMissError(f"No captured response for {request.method} {_sanitize(request.url)}")
+
+        with _lock:
+            index = self.served.get(served_key, 0)
+            self.served[served_key] = index + 1
+        entry = candidates[min(index, len(candidates) - 1)]
+
+        if self.latency == 'original':
+            time.sleep(entry['latency'])
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = (entry['response'] or '').encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=entry['latency'])
+        return response
+
+
+class DryRun:
+    """Let reads through to the current transport and fake every write.
+
+    Faked writes answer with an ``id`` of ``0`` so callers that read the ID of
+    a created task keep working.
+    """
+
+    def __init__(self):
+        import requests
+        self.passthrough = requests.Session.send
+
+    def send(self, session, request, **kwargs):
+        import requests
+
+        path = request.path_url.split('?')[0]
+        if request.method == 'GET' or (request.method == 'POST' and path.endswith(READ_ONLY_POST_SUFFIXES)):
+            return self.passthrough(session, request, **kwargs)
+
+        print(f"Dry run: would {request.method} {_sanitize(request.url)}")
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = json.dumps({'id': '0'}).encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(0)
+        return response
+
+
+# Function to route every requests call through a recorder or replayer
+def install(transport):
+    global _original_send
+    import requests
+
+    if _original_send is None:
+        _original_send = requests.Session.send
+
+    def send(session, request, **kwargs):
+        return transport.send(session, request, **kwargs)
+
+    requests.Session.send = send
+    return transport
+
+
+# Function to restore the real network transport
+def uninstall():
+    global _original_send
+    if _original_send is not None:
+        import requests
+        requests.Session.send = _original_send
+        _original_send = None
+
+
+# Function to enable capture, replay and dry run from environment variables
+def install_from_env():
+    transport = _install_capture_or_replay()
+    if os.getenv(DRY_RUN_ENV) == '1':
+        # Layered on top so dry runs can also read from a replayed capture
+        print("Dry run: no changes will be written")
+        transport = install(DryRun())
+    return transport
+
+
+def _install_capture_or_replay():
+    replay_file = os.getenv(REPLAY_ENV)
+    capture_file = os.getenv(CAPTURE_ENV)
+    if replay_file:
+        latency = os.getenv(REPLAY_LATENCY_ENV, 'original')
+        if latency not in ('original', 'zero'):
+            raise ValueError(f"{REPLAY_LATENCY_ENV} must be 'original' or 'zero', got '{latency}'")
+        # Captures are sanitized, so replay works without real credentials
+        for name in ('NOTION_API_TOKEN', 'TODOIST_API_TOKEN'):
+            os.environ.setdefault(name, SECRET_PLACEHOLDER)
+        os.environ.setdefault('NOTION_DATABASE_ID', DATABASE_PLACEHOLDER)
+        print(f"Replaying traffic from {replay_file} ({latency} latency)")
+        return install(Replayer(replay_file, latency))
+    if capture_file:
+        print(f"Capturing traffic to {capture_file}")
+        return install(Recorder(capture_file))
+    return None